@@ -35,7 +35,7 @@ class MainWindow(QtWidgets.QMainWindow):
         self.setCentralWidget(mainWidget)
         self.mapView.show()
 
-        self.displayMap = QDisplayWindow(QtGui.QPixmap())
+        self.displayMap = QDisplayWindow(self.mapScene.mapItem)
 
     # Initializes all the buttons used for drawing on the canvas. ie: colors and eraser
     def addPaletteTools(self, layout):
@@ -94,6 +94,16 @@ class MainWindow(QtWidgets.QMainWindow):
         fullScreen.clicked.connect(lambda: self.toggleDisplayFullScreen())
         layout.addWidget(fullScreen)
 
+        # Add output resolution selection for the player display
+        resolutionSelect = QtWidgets.QComboBox()
+        resolutionSelect.addItems(list(RESOLUTIONS))
+        resolutionSelect.setCurrentText(DEFAULT_RESOLUTION)
+        resolutionSelect.setToolTip("Markings are rescaled to the new resolution. Switching back before "
+                                    "drawing again restores them exactly, but drawing first makes the loss permanent.")
+        resolutionSelect.currentTextChanged.connect(
+            lambda text: self.mapScene.mapItem.setResolution(RESOLUTIONS[text]))
+        layout.addWidget(resolutionSelect)
+
         # Add panning button
         pan = QIconButton("Assets/panningIcon.png")
         pan.clicked.connect(lambda: self.mapView.setMouseMode(MouseMode.Panning))
@@ -159,7 +169,7 @@ class MainWindow(QtWidgets.QMainWindow):
 
     # Opens the display window for the player monitor
     def openDisplay(self):
-        self.displayMap = QDisplayWindow(self.mapScene.mapItem.pixmap())
+        self.displayMap = QDisplayWindow(self.mapScene.mapItem)
         self.displayMap.show()
         self.mapScene.mapItem.setDisplayRef(self.displayMap)
 
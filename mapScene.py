@@ -15,6 +15,19 @@ MEASURE_SQUARE_WIDTH = 2
 SPELL_WIDTH = 4
 SPELL_OPACITY = 0.3
 
+# Output resolutions available for the player display
+RESOLUTIONS = {
+    "1080p": QtCore.QSize(1920, 1080),
+    "1440p": QtCore.QSize(2560, 1440),
+    "4K": QtCore.QSize(3840, 2160),
+    "Ultrawide 1080p": QtCore.QSize(2560, 1080),
+    "Ultrawide 1440p": QtCore.QSize(3440, 1440),
+}
+DEFAULT_RESOLUTION = "1080p"
+
+# Premultiplied ARGB is the format QPainter composites fastest and can be painted in place
+LAYER_FORMAT = QtGui.QImage.Format.Format_ARGB32_Premultiplied
+
 
 # Different modes the mouse can be in
 class MouseMode(Enum):
@@ -30,12 +43,32 @@ class SpellType(Enum):
     Cone = 2
 
 
+# Creates a transparent drawing layer at the given resolution
+def newLayer(size):
+    layer = QtGui.QImage(size, LAYER_FORMAT)
+    layer.fill(Qt.transparent)
+    return layer
+
+
+# Creates a copy of a drawing layer smoothly scaled to the given size
+def scaledLayer(layer, size):
+    if layer.size() == size:
+        return QtGui.QImage(layer)
+
+    scaled = newLayer(size)
+    painter = QtGui.QPainter(scaled)
+    painter.setRenderHint(QtGui.QPainter.RenderHint.SmoothPixmapTransform)
+    painter.drawImage(QtCore.QRectF(QtCore.QPointF(0, 0), QtCore.QSizeF(size)), layer)
+    painter.end()
+    return scaled
+
+
 # Scene that contains all active 2D objects
 class QMapScene(QtWidgets.QGraphicsScene):
-    def __init__(self, mapFile):
+    def __init__(self, mapFile, resolution=RESOLUTIONS[DEFAULT_RESOLUTION]):
         super().__init__()
 
-        self.mapItem = QCanvasItem(QtGui.QPixmap(mapFile))
+        self.mapItem = QCanvasItem(mapFile, resolution)
         self.mapItem.setTransformationMode(Qt.SmoothTransformation)
         self.addItem(self.mapItem)
 
@@ -112,25 +145,28 @@ class QScalingView(QtWidgets.QGraphicsView):
 
 # Primary viewport for map that can be edited allowing for markings or effects on the map to appear to players
 class QCanvasItem(QtWidgets.QGraphicsPixmapItem):
-    def __init__(self, pixmap):
-        super().__init__(pixmap)
-        scaledMap = self.pixmap().scaled(1920, 1080, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-        self.setPixmap(scaledMap)
-        self.mapPixmap = self.pixmap().copy()
-        self.canvasPixmap = QtGui.QPixmap(1920, 1080)
-        self.canvasPixmap.fill(Qt.transparent)
-
-        self.prevState = self.canvasPixmap.copy()
+    def __init__(self, mapFile, resolution=RESOLUTIONS[DEFAULT_RESOLUTION]):
+        super().__init__()
+        self.mapFile = mapFile
+        self.resolution = QtCore.QSize(resolution)
+        self.loadMap(mapFile)
+
+        # Layers only cover the scaled map, not the whole output resolution
+        self.canvasImage = newLayer(self.pixmap().size())
+        self.overlayImage = newLayer(self.pixmap().size())
+
+        self.prevState = QtGui.QImage(self.canvasImage)
+        # Markings and undo state as last edited, so resolution switches never resample a resample
+        self.resampleSource = None
         self.penSize = DEFAULT_PEN_SIZE
         self.eraserSize = DEFAULT_ERASER_SIZE
         self.penColor = QtGui.QColor('#000000')
         self.lastPos = QtCore.QPoint()
 
-        self.fiveFootSize = DEFAULT_FIVE_FOOT_SIZE
+        self.setFiveFootSize(DEFAULT_FIVE_FOOT_SIZE)
         self.measureStart = QtCore.QPoint()
         self.measureEnd = QtCore.QPoint()
         self.measureLabelRef = QtWidgets.QLabel()
-        self.preservedState = self.canvasPixmap.copy()
 
         self.spellSizeFt = DEFAULT_SPELL_SIZE_FT
         self.spellSize = int((DEFAULT_SPELL_SIZE_FT / 5) * DEFAULT_FIVE_FOOT_SIZE)
@@ -139,36 +175,99 @@ class QCanvasItem(QtWidgets.QGraphicsPixmapItem):
         self.showPlayers = True
 
         self.displayRef = None
+        self.playersSeeOverlay = True
         self.mouseMode = MouseMode.Drawing
 
-    # Updates the map in viewport and display by drawing edited maps over the main mat
+        self.updateMap()
+
+    # Updates the map in viewport and display so the edited layers are repainted over the main mat
     def updateMap(self, updateDisplay=True):
-        newPixmap = self.mapPixmap.copy()
-        painter = QtGui.QPainter(newPixmap)
-        painter.drawPixmap(0, 0, 1920, 1080, self.canvasPixmap)
-        painter.end()
-        self.setPixmap(newPixmap)
+        self.playersSeeOverlay = updateDisplay
+        self.update()
 
         if self.displayRef is not None and updateDisplay:
-            self.displayRef.updatePixmap(newPixmap)
-
-    # Resets canvas with new map scaled to fit 1920x1080 display
+            self.displayRef.updateMap()
+
+    # Draws the mat, markings and previews into target without building a combined frame
+    def paintLayers(self, painter, target, forPlayers=False):
+        source = QtCore.QRectF(QtCore.QPointF(0, 0), QtCore.QSizeF(self.pixmap().size()))
+        painter.drawPixmap(target, self.pixmap(), source)
+        painter.drawImage(target, self.canvasImage, source)
+        if not forPlayers or self.playersSeeOverlay:
+            painter.drawImage(target, self.overlayImage, source)
+
+    # Paints the layers straight from their buffers whenever the view repaints the item
+    def paint(self, painter, option, widget=None):
+        painter.setRenderHint(QtGui.QPainter.RenderHint.SmoothPixmapTransform,
+                              self.transformationMode() == Qt.SmoothTransformation)
+        self.paintLayers(painter, QtCore.QRectF(QtCore.QPointF(0, 0), QtCore.QSizeF(self.pixmap().size())))
+
+    # Loads a map file scaled to fit the output resolution, leaving the current map if it can't be read
+    def loadMap(self, mapFile):
+        mapImage = QtGui.QImage(mapFile)
+        if mapImage.isNull():
+            return False
+
+        self.mapFile = mapFile
+        mapImage = mapImage.scaled(self.resolution, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        self.setPixmap(QtGui.QPixmap.fromImage(mapImage))
+        return True
+
+    # Resets canvas with new map scaled to fit the output resolution
     def setNewMap(self, mapFile):
-        self.mapPixmap = QtGui.QPixmap(mapFile)
-        self.mapPixmap = self.mapPixmap.scaled(1920, 1080, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-        self.canvasPixmap = QtGui.QPixmap(1920, 1080)
-        self.canvasPixmap.fill(Qt.transparent)
-        self.prevState = self.canvasPixmap.copy()
-        self.preservedState = self.canvasPixmap.copy()
+        if not self.loadMap(mapFile):
+            return
+
+        if self.canvasImage.size() == self.pixmap().size():
+            self.canvasImage.fill(Qt.transparent)
+            self.overlayImage.fill(Qt.transparent)
+        else:
+            self.canvasImage = newLayer(self.pixmap().size())
+            self.overlayImage = newLayer(self.pixmap().size())
+        self.prevState = QtGui.QImage(self.canvasImage)
+        self.resampleSource = None
+        self.setFiveFootSize(self.fiveFootSize)
+        self.updateMap()
+
+    # Sets a new output resolution, rescaling the map, markings and tile size to match
+    def setResolution(self, resolution):
+        resolution = QtCore.QSize(resolution)
+        if resolution == self.resolution:
+            return
+
+        oldResolution = self.resolution
+        self.resolution = resolution
+        if not self.loadMap(self.mapFile):
+            self.resolution = oldResolution
+            return
+
+        # The map keeps its aspect ratio, so scaling markings to its size keeps them on the same features
+        if self.resampleSource is None:
+            self.resampleSource = (self.canvasImage, self.prevState)
+        canvasSource, prevSource = self.resampleSource
+        self.canvasImage = scaledLayer(canvasSource, self.pixmap().size())
+        self.prevState = scaledLayer(prevSource, self.pixmap().size())
+        self.overlayImage = newLayer(self.pixmap().size())
+        self.coneOrigin = None
+
+        self.fiveFootSize = max(1, round(self.fiveFootScale * self.pixmap().width()))
+        self.setSpellSize(self.spellSizeFt)
+        self.measureLabelRef.setText("5 ft: %s px" % self.fiveFootSize)
         self.updateMap()
 
+    # Clears any rulers or spell previews drawn over the canvas
+    def clearOverlay(self):
+        self.overlayImage.fill(Qt.transparent)
+
     # Handles mouse presses depending on current mouse mode
     def mousePressEvent(self, event):
         # Drawing and erasing mouse press event handler
         if self.mouseMode == MouseMode.Drawing or self.mouseMode == MouseMode.Erasing:
             self.lastPos = event.pos()
-            self.prevState = self.canvasPixmap.copy()
-            painter = QtGui.QPainter(self.canvasPixmap)
+            # Shares the canvas data until the painter below detaches it
+            self.prevState = QtGui.QImage(self.canvasImage)
+            self.resampleSource = None
+            painter = QtGui.QPainter(self.canvasImage)
 
             pen = painter.pen()
             if self.mouseMode == MouseMode.Erasing:
@@ -182,7 +281,6 @@ class QCanvasItem(QtWidgets.QGraphicsPixmapItem):
             painter.drawPoint(event.pos())
             painter.end()
             self.updateMap()
-            self.preservedState = self.canvasPixmap.copy()
         # Casting mouse press event handler
         elif self.mouseMode == MouseMode.Casting:
             if self.spellType == SpellType.Cone:
@@ -190,9 +288,14 @@ class QCanvasItem(QtWidgets.QGraphicsPixmapItem):
                     self.coneOrigin = event.pos().toPoint()
                     return
 
-            self.prevState = self.preservedState.copy()
+            # Commits the previewed spell from the overlay onto the canvas
+            self.prevState = QtGui.QImage(self.canvasImage)
+            self.resampleSource = None
+            painter = QtGui.QPainter(self.canvasImage)
+            painter.drawImage(0, 0, self.overlayImage)
+            painter.end()
+            self.clearOverlay()
             self.updateMap()
-            self.preservedState = self.canvasPixmap.copy()
             self.coneOrigin = None
         # Measuring mouse press event handler
         elif self.mouseMode == MouseMode.Measuring:
@@ -203,7 +306,7 @@ class QCanvasItem(QtWidgets.QGraphicsPixmapItem):
     def mouseMoveEvent(self, event):
         # Drawing and erasing mouse move event handler
         if self.mouseMode == MouseMode.Drawing or self.mouseMode == MouseMode.Erasing:
-            painter = QtGui.QPainter(self.canvasPixmap)
+            painter = QtGui.QPainter(self.canvasImage)
 
             pen = painter.pen()
             if self.mouseMode == MouseMode.Erasing:
@@ -218,7 +321,6 @@ class QCanvasItem(QtWidgets.QGraphicsPixmapItem):
             painter.end()
             self.updateMap()
             self.lastPos = event.pos()
-            self.preservedState = self.canvasPixmap.copy()
         # Measuring mouse move event handler
         elif self.mouseMode == MouseMode.Measuring:
             mouseEnd = event.pos().toPoint()
@@ -246,8 +348,8 @@ class QCanvasItem(QtWidgets.QGraphicsPixmapItem):
                     xAdjusted = self.measureStart.x() + abs(yDiff)
                     self.measureEnd = QtCore.QPoint(xAdjusted, mouseEnd.y())
 
-            newCanvasPixmap = self.preservedState.copy()
-            painter = QtGui.QPainter(newCanvasPixmap)
+            self.clearOverlay()
+            painter = QtGui.QPainter(self.overlayImage)
 
             pen = QtGui.QPen()
             pen.setColor(MEASURE_SQUARE_COLOR)
@@ -264,7 +366,6 @@ class QCanvasItem(QtWidgets.QGraphicsPixmapItem):
 
             painter.end()
 
-            self.canvasPixmap = newCanvasPixmap
             self.updateMap(updateDisplay=False)
 
     # Handles mouse hover events depending on current mouse mode
@@ -272,8 +373,8 @@ class QCanvasItem(QtWidgets.QGraphicsPixmapItem):
         # Handles casting mouse hover events
         if self.mouseMode == MouseMode.Casting:
             if self.spellType != SpellType.Cone or self.coneOrigin is not None:
-                newCanvasPixmap = self.preservedState.copy()
-                painter = QtGui.QPainter(newCanvasPixmap)
+                self.clearOverlay()
+                painter = QtGui.QPainter(self.overlayImage)
 
                 pen = QtGui.QPen()
                 pen.setColor(self.penColor)
@@ -323,13 +424,12 @@ class QCanvasItem(QtWidgets.QGraphicsPixmapItem):
 
                 painter.end()
 
-                self.canvasPixmap = newCanvasPixmap
                 self.updateMap(updateDisplay=self.showPlayers)
 
     # Handles mouse leaving hover range depending on mouse mode
     def hoverLeaveEvent(self, event):
         if self.mouseMode == MouseMode.Casting:
-            self.canvasPixmap = self.preservedState
+            self.clearOverlay()
             self.updateMap()
 
     # Handles mouse release events depending on current mouse mode
@@ -341,8 +441,8 @@ class QCanvasItem(QtWidgets.QGraphicsPixmapItem):
         elif self.mouseMode == MouseMode.Measuring:
             if self.measureEnd == self.measureStart:
                 return
-            self.canvasPixmap = self.preservedState
-            self.fiveFootSize = abs(self.measureStart.x() - self.measureEnd.x())
+            self.clearOverlay()
+            self.setFiveFootSize(abs(self.measureStart.x() - self.measureEnd.x()))
             self.setSpellSize(self.spellSizeFt)
             self.measureLabelRef.setText("5 ft: %s px" % self.fiveFootSize)
             self.updateMap()
@@ -353,11 +453,10 @@ class QCanvasItem(QtWidgets.QGraphicsPixmapItem):
 
     # Returns the canvas to its previous state
     def undoLast(self):
-        self.canvasPixmap = self.prevState
+        self.canvasImage = QtGui.QImage(self.prevState)
+        self.resampleSource = None
+        self.clearOverlay()
         self.updateMap()
-        if self.displayRef is not None:
-            self.displayRef.updatePixmap(self.pixmap())
-        self.preservedState = self.canvasPixmap.copy()
 
     # Sets a new size for the draw tool
     def setPenSize(self, size):
@@ -373,14 +472,22 @@ class QCanvasItem(QtWidgets.QGraphicsPixmapItem):
     def setPenColor(self, color):
         self.penColor = QtGui.QColor(color)
 
-    # sets mouse input mode for canvas
+    # sets mouse input mode for canvas, discarding any unfinished rulers or spells
     def setMouseMode(self, mode):
         self.mouseMode = mode
+        self.coneOrigin = None
+        self.clearOverlay()
+        self.updateMap()
 
     # Sets the text for the label displaying pixel value of a 5 ft distance
     def setMeasureLabel(self, label):
         self.measureLabelRef = label
 
+    # Sets the 5 ft tile size in px, keeping it as a fraction of the map width so it survives resolution changes
+    def setFiveFootSize(self, size):
+        self.fiveFootSize = size
+        self.fiveFootScale = size / max(1, self.pixmap().width())
+
     # Sets the spell size for both ft and px
     def setSpellSize(self, size):
         if size != "":
@@ -400,15 +507,31 @@ class QCanvasItem(QtWidgets.QGraphicsPixmapItem):
 
 # Window that displays the edited map to the players
 class QDisplayWindow(QtWidgets.QMainWindow):
-    def __init__(self, pixmap):
+    def __init__(self, canvas):
         super().__init__()
 
-        self.map = QtWidgets.QLabel()
-
+        self.map = QDisplayCanvas(canvas)
         self.setCentralWidget(self.map)
-        self.map.setScaledContents(True)
-        self.map.setPixmap(pixmap)
 
-    # sets the battle mat to a different one
-    def updatePixmap(self, newMap):
-        self.map.setPixmap(newMap)
+    # Repaints the battle mat with the latest edits
+    def updateMap(self):
+        self.map.update()
+
+
+# Widget that paints the canvas layers scaled to fill the display window
+class QDisplayCanvas(QtWidgets.QWidget):
+    def __init__(self, canvas):
+        super().__init__()
+        self.canvasRef = canvas
+
+    # Opens the display at the size of the map, capped so high resolutions still fit on the screen
+    def sizeHint(self):
+        screenSize = QtGui.QGuiApplication.primaryScreen().availableGeometry().size()
+        return self.canvasRef.pixmap().size().boundedTo(screenSize)
+
+    # Draws the map and its edits stretched over the whole window
+    def paintEvent(self, event):
+        painter = QtGui.QPainter(self)
+        painter.setRenderHint(QtGui.QPainter.RenderHint.SmoothPixmapTransform)
+        self.canvasRef.paintLayers(painter, QtCore.QRectF(self.rect()), forPlayers=True)
+        painter.end()